@@ -1,14 +1,37 @@
-from pydantic import BaseModel
-import xml.etree.ElementTree as ET
-from collections import defaultdict
+from pydantic import ConfigDict
+from pydantic.dataclasses import dataclass
+from lxml import etree as ET
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import cv2
+import numba
 import numpy as np
-from PIL import Image
 
 from gfs import temp
-from sdk.ffmpeg import extract_frame
+from sdk.ffmpeg import extract_frames_async
 
 
-class Task(BaseModel):
+def _release(elem):
+    """釋放已處理完的 element 及其前面的 siblings"""
+    elem.clear()
+    while elem.getprevious() is not None:
+        del elem.getparent()[0]
+
+
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flux")
+_CACHE_VERSION = 1  # 解 frame 的方式改變時調高，讓舊的快取失效
+_mask_buffers = threading.local()
+
+
+@dataclass(frozen=True, slots=True)
+class Task:
     url: str
     frame_count: int
     start_frame: int
@@ -16,90 +39,255 @@ class Task(BaseModel):
     height: int
 
 
-class Box(BaseModel):
-    task_id: str
-    xtl: float
-    ytl: float
-    xbr: float
-    ybr: float
+@dataclass(frozen=True, slots=True, config=ConfigDict(arbitrary_types_allowed=True))
+class MaskSpec:
+    """以 box 座標表示的 mask，需要像素時才呼叫 rasterize / save"""
+
+    boxes: np.ndarray  # (N, 4) 的 xtl, ytl, xbr, ybr
+    width: int
+    height: int
+
+    def rasterize(self) -> np.ndarray:
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        _fill_boxes(mask, self.boxes, self.width, self.height)
+        return mask
+
+    def save(self) -> str:
+        """存成 PNG 檔並回傳路徑"""
+        return create_mask_from_boxes(
+            self.boxes,
+            self.width,
+            self.height,
+            out=_mask_buffer(self.height, self.width),
+        )
 
 
-class FluxData(BaseModel):
+@dataclass(frozen=True, slots=True)
+class FluxData:
     image: str
-    mask: str
+    mask: MaskSpec
     frame_number: int
+    index: int  # 在 dataset 中的位置，處理完後交給 FluxDataset.commit
 
 
-def create_mask_from_boxes(boxes: list[Box], width: int, height: int):
-    """處理多個 boxes"""
-    mask = np.zeros((height, width), dtype=np.uint8)
+@numba.njit(cache=True, nogil=True)
+def _fill_boxes(mask: np.ndarray, boxes: np.ndarray, width: int, height: int):
+    """裁切並填滿每個 box，同一個迴圈內完成，回傳所有 box 聯集的範圍"""
+    x_min, y_min, x_max, y_max = width, height, 0, 0
+    for i in range(boxes.shape[0]):
+        x1 = max(0, min(int(boxes[i, 0]), width - 1))
+        y1 = max(0, min(int(boxes[i, 1]), height - 1))
+        x2 = max(0, min(int(boxes[i, 2]), width))
+        y2 = max(0, min(int(boxes[i, 3]), height))
+        if x2 <= x1 or y2 <= y1:
+            continue
+        for y in range(y1, y2):
+            for x in range(x1, x2):
+                mask[y, x] = 255
+        x_min, y_min = min(x_min, x1), min(y_min, y1)
+        x_max, y_max = max(x_max, x2), max(y_max, y2)
+    return x_min, y_min, x_max, y_max
 
-    for box in boxes:
-        x1 = int(box.xtl)
-        y1 = int(box.ytl)
-        x2 = int(box.xbr)
-        y2 = int(box.ybr)
 
-        x1 = max(0, min(x1, width - 1))
-        y1 = max(0, min(y1, height - 1))
-        x2 = max(0, min(x2, width))
-        y2 = max(0, min(y2, height))
+def _mask_buffer(height: int, width: int) -> np.ndarray:
+    """每個 thread 各自重複使用一塊內容全為 0 的 mask buffer，不夠大時才重新配置"""
+    buf = getattr(_mask_buffers, "buf", None)
+    if buf is None or buf.shape[0] < height or buf.shape[1] < width:
+        shape = (
+            (height, width)
+            if buf is None
+            else (
+                max(height, buf.shape[0]),
+                max(width, buf.shape[1]),
+            )
+        )
+        buf = _mask_buffers.buf = np.zeros(shape, dtype=np.uint8)
+    return buf
+
+
+def create_mask_from_boxes(
+    boxes: np.ndarray, width: int, height: int, out: np.ndarray | None = None
+):
+    """處理多個 boxes，boxes 為 (N, 4) 的 xtl, ytl, xbr, ybr 陣列
 
-        mask[y1:y2, x1:x2] = 255
+    out 為可重複使用、內容全為 0 的 buffer，大小至少 (height, width)；
+    用完後只把畫過的範圍清回 0，不必每次重新配置整張 mask
+    """
+    if out is None:
+        out = np.zeros((height, width), dtype=np.uint8)
+    mask = out[:height, :width]
+    x_min, y_min, x_max, y_max = _fill_boxes(mask, boxes, width, height)
 
-    output_path = temp.filename(".jpg")
-    image = Image.fromarray(mask)
-    image.save(output_path)
+    # 二值 mask 用 PNG 無損又比 JPEG 小，壓縮等級 1 換取編碼速度
+    output_path = temp.filename(".png")
+    try:
+        if not cv2.imwrite(output_path, mask, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+            raise OSError(f"無法寫入 mask: {output_path}")
+    finally:
+        # 寫檔失敗也要清回 0，否則同 thread 之後的 mask 都會殘留這次的 box
+        mask[y_min:y_max, x_min:x_max] = 0
     return output_path
 
 
+def _cache_path(url: str, frame_number: int) -> str:
+    key = hashlib.sha1(f"{_CACHE_VERSION}|{url}|{frame_number}".encode()).hexdigest()
+    return os.path.join(_CACHE_DIR, f"{key}.jpg")
+
+
+async def _cached_extract(url: str, frame_numbers: list[int]) -> dict[int, str]:
+    """以 (url, frame_number) 為 key 把解出來的 frame 快取在硬碟上，
+    沒有快取的 frame 用一次 ffmpeg 呼叫一起解出來"""
+    paths = {n: _cache_path(url, n) for n in frame_numbers}
+    missing = [n for n, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        for n, output in (await extract_frames_async(url, missing)).items():
+            # 快取目錄由多個 process 共用，每個寫入者各自 stage 到唯一的暫存檔，寫完才 os.replace
+            fd, staging = tempfile.mkstemp(suffix=".tmp", dir=_CACHE_DIR)
+            os.close(fd)
+            try:
+                shutil.move(output, staging)
+                os.replace(staging, paths[n])
+            except BaseException:
+                if os.path.exists(staging):
+                    os.remove(staging)
+                raise
+    return paths
+
+
 class FluxDataset:
-    def __init__(self):
-        tree = ET.parse("./annotation/cvat_for_video.xml")
-        root = tree.getroot()
-        tasks = root.find("meta").find("project").find("tasks").findall("task")
-        tracks = root.findall("track")
+    def __init__(self, prefetch: int = 8, workers: int = 4, max_ffmpeg: int = 16):
         acc_frame = 0
 
         self.tasks: dict[str, Task] = {}  # key : task id
-        self.boxes: dict[int, list[Box]] = defaultdict(list)  # key : frame number
-
-        for task in tasks:
-            frame_count = int(task.find("size").text)
-            ratio = task.find("original_size")
-            self.tasks[task.find("id").text] = Task(
-                url=f"https://creative-assets.gliacloud.com/{task.find('name').text}",
-                frame_count=frame_count,
-                start_frame=acc_frame,
-                width=ratio.find("width").text,
-                height=ratio.find("height").text,
-            )
-            acc_frame += frame_count
-
-        for track in tracks:
-            for box in track.findall("box"):
-                frame_number = int(box.get("frame"))
-                box = Box(
-                    task_id=track.get("task_id"),
-                    xtl=box.get("xtl"),
-                    ytl=box.get("ytl"),
-                    xbr=box.get("xbr"),
-                    ybr=box.get("ybr"),
+        # box 以欄位分開存放 (struct of arrays)，最後依 frame 排序
+        frames: list[int] = []
+        task_ids: list[str] = []
+        xyxy: list[tuple[float, float, float, float]] = []
+
+        # meta 裡的 <task> 一定在 <track> 之前，單次串流即可
+        context = ET.iterparse(
+            "./annotation/cvat_for_video.xml", events=("end",), tag=("task", "track")
+        )
+        for _, elem in context:
+            if elem.tag == "task":
+                task = elem
+                frame_count = int(task.findtext("size"))
+                self.tasks[task.findtext("id")] = Task(
+                    url=f"https://creative-assets.gliacloud.com/{task.findtext('name')}",
+                    frame_count=frame_count,
+                    start_frame=acc_frame,
+                    width=int(task.findtext("original_size/width")),
+                    height=int(task.findtext("original_size/height")),
                 )
-                self.boxes[frame_number].append(box)
+                acc_frame += frame_count
+            else:
+                track_tid = elem.get("task_id")
+                for box in elem.iter("box"):
+                    a = box.attrib
+                    frames.append(int(a["frame"]))
+                    task_ids.append(track_tid)
+                    xyxy.append(
+                        (
+                            float(a["xtl"]),
+                            float(a["ytl"]),
+                            float(a["xbr"]),
+                            float(a["ybr"]),
+                        )
+                    )
 
-        self._frame_keys = sorted(self.boxes.keys())
+            _release(elem)
+        del context
+
+        order = np.argsort(np.asarray(frames, dtype=np.int32), kind="stable")
+        self._frame = np.asarray(frames, dtype=np.int32)[order]
+        self._bbox = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)[order]
+        self._task = np.asarray(task_ids, dtype=object)[order]
+
+        # CSR 結構：第 i 個 frame 的 box 為 _bbox[_frame_starts[i]:_frame_starts[i + 1]]
+        self._frame_keys, first_idx = np.unique(self._frame, return_index=True)
+        self._frame_keys = self._frame_keys.tolist()
+        self._frame_starts = np.append(first_idx, len(self._frame)).tolist()
+
+        # 每個 task 需要的 frame，解 frame 時以 task 為單位一次處理
+        self._task_frames: dict[str, list[int]] = {}
+        for frame_number, task_id in zip(self._frame_keys, self._task[first_idx]):
+            self._task_frames.setdefault(task_id, []).append(frame_number)
+        self._image_cache: dict[int, str] = {}  # key : frame number
         with open("current_index.txt", "r") as fp:
             self._current_frame_index = int(fp.read())
 
-    def _fetch(self, index: int) -> FluxData:
+        # 預先抓取後面幾個 frame：ffmpeg 在背景的 event loop 以 subprocess 並行，
+        # 影片下載交給 loop 的 executor
+        self._prefetch = prefetch
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._pool)
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._ffmpeg_slots = asyncio.Semaphore(max_ffmpeg)
+        self._url_locks: dict[str, asyncio.Lock] = {}  # 只在 loop thread 內存取
+        self._queue: deque[Future[FluxData]] = deque()
+
+    def _box_slice(self, index: int) -> slice:
+        return slice(self._frame_starts[index], self._frame_starts[index + 1])
+
+    def boxes_for(self, frame_number: int) -> np.ndarray:
+        """回傳該 frame 所有 box 的 (N, 4) view"""
+        index = bisect_left(self._frame_keys, frame_number)
+        if index == len(self._frame_keys) or self._frame_keys[index] != frame_number:
+            return self._bbox[:0]
+        return self._bbox[self._box_slice(index)]
+
+    async def _materialize_task(self, task_id: str):
+        task = self.tasks[task_id]
+        frames = self._task_frames[task_id]
+        # 同一支影片同時只跑一個 ffmpeg，其他 frame 等它做完直接用快取
+        async with self._url_locks.setdefault(task.url, asyncio.Lock()):
+            if all(f in self._image_cache for f in frames):
+                return
+            async with self._ffmpeg_slots:
+                paths = await _cached_extract(
+                    task.url, [f - task.start_frame for f in frames]
+                )
+        for frame_number in frames:
+            self._image_cache[frame_number] = paths[frame_number - task.start_frame]
+
+    async def _materialize_all_async(self):
+        await asyncio.gather(
+            *(self._materialize_task(task_id) for task_id in self._task_frames)
+        )
+
+    def _materialize_all(self):
+        """每個 task 只跑一次 ffmpeg，解出所有需要的 frame"""
+        self._run(self._materialize_all_async()).result()
+
+    def _normalize_index(self, index: int) -> int:
+        """負的 index 與 list 一樣從尾端算起，超出範圍時丟 IndexError"""
+        n = len(self._frame_keys)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("FluxDataset index out of range")
+        return index
+
+    async def _fetch_async(self, index: int) -> FluxData:
+        index = self._normalize_index(index)
         current_frame = self._frame_keys[index]
-        boxes = self.boxes[current_frame]
-        task = self.tasks.get(boxes[0].task_id)
-        mask = create_mask_from_boxes(boxes, task.width, task.height)
-        image = extract_frame(task.url, current_frame - task.start_frame)
+        sl = self._box_slice(index)
+        task_id = self._task[sl.start]
+        task = self.tasks.get(task_id)
+        mask = MaskSpec(boxes=self._bbox[sl], width=task.width, height=task.height)
+        if current_frame not in self._image_cache:
+            await self._materialize_task(task_id)
+        image = self._image_cache[current_frame]
+
+        return FluxData(image=image, mask=mask, frame_number=current_frame, index=index)
 
-        return FluxData(image=image, mask=mask, frame_number=current_frame)
+    def _run(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _fetch(self, index: int) -> FluxData:
+        return self._run(self._fetch_async(index)).result()
 
     def __iter__(self):
         return self
@@ -108,11 +296,36 @@ class FluxDataset:
         if self._current_frame_index >= len(self._frame_keys):
             raise StopIteration
 
-        with open("current_index.txt", "w") as fp:
-            fp.write(str(self._current_frame_index))
-        data = self._fetch(self._current_frame_index)
+        self._schedule()
+        future = self._queue.popleft()
+        # 取出的 future 失敗時 index 也要前進，queue 的開頭才會維持在 _current_frame_index
         self._current_frame_index += 1
-        return data
+        try:
+            return future.result()
+        finally:
+            self._schedule()
+
+    def commit(self, index: int):
+        """記錄下次從 index 開始，呼叫者須確定 index 之前的 frame 都已處理並存好結果"""
+        # 先寫暫存檔並 fsync 再 os.replace，中途當掉也不會留下空的 current_index.txt
+        fd, staging = tempfile.mkstemp(suffix=".tmp", dir=".")
+        try:
+            with os.fdopen(fd, "w") as fp:
+                fp.write(str(index))
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(staging, "current_index.txt")
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    def _schedule(self):
+        """補滿 prefetch queue，queue 的開頭永遠是 _current_frame_index"""
+        next_index = self._current_frame_index + len(self._queue)
+        while len(self._queue) < self._prefetch and next_index < len(self._frame_keys):
+            self._queue.append(self._run(self._fetch_async(next_index)))
+            next_index += 1
 
     def __len__(self):
         return len(self._frame_keys)
@@ -1,34 +1,42 @@
+import dataclasses
+import os
 import re
-from distutils import version
 
-import pydantic
+_APP_RE = re.compile(r"^[\w\-]+$")
+_INST_RE = re.compile(r"^[\w\-\.\:]+$")
+# same grammar as distutils.version.StrictVersion, e.g. 1.0, 1.0.1, 1.0.1a0
+_VER_RE = re.compile(r"^\d+\.\d+(\.\d+)?([ab]\d+)?$", re.ASCII)
 
 
-class APPConfig(pydantic.BaseSettings):
-    application: str = pydantic.Field(env="APP_NAME", default="foo-application")
-    version: str = pydantic.Field(env="APP_VERSION", default="0.0.1a0")
-    instance: str = pydantic.Field(env="HOSTNAME", default="localhost")
+@dataclasses.dataclass(frozen=True, slots=True)
+class APPConfig:
+    application: str = "foo-application"
+    version: str = "0.0.1a0"
+    instance: str = "localhost"
 
-    @pydantic.validator("application")
-    def application_validate(cls, v: str) -> str:
-        if not re.match(r"^[\w\-]+$", v):
-            raise ValueError(f"application format not correct {v}")
-        return v
-
-    @pydantic.validator("version")
-    def version_validate(cls, v: str) -> str:
-        version.StrictVersion(v)
-        return v
-
-    @pydantic.validator("instance")
-    def instance_validate(cls, v: str) -> str:
-        if not re.match(r"^[\w\-\.\:]+$", v):
-            raise ValueError(f"instance format not correct {v}")
-        return v
+    def __post_init__(self) -> None:
+        if not _APP_RE.match(self.application):
+            raise ValueError(f"application format not correct {self.application}")
+        if not _VER_RE.match(self.version):
+            raise ValueError(f"version format not correct {self.version}")
+        if not _INST_RE.match(self.instance):
+            raise ValueError(f"instance format not correct {self.instance}")
 
     @property
     def is_staging(self) -> bool:
         return "a" in self.version or "b" in self.version
 
 
-app: APPConfig = APPConfig()
+def _load() -> APPConfig:
+    """
+    Reads the config from the environment variables once, falling back to the field defaults.
+    """
+    env = {
+        "application": os.environ.get("APP_NAME"),
+        "version": os.environ.get("APP_VERSION"),
+        "instance": os.environ.get("HOSTNAME"),
+    }
+    return APPConfig(**{k: v for k, v in env.items() if v is not None})
+
+
+app: APPConfig = _load()
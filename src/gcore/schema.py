@@ -84,72 +84,73 @@ class Language(str, enum.Enum):
     yue = "yue"  # Yue Chinese (Cantonese)
 
 
-FULL_LANG = {
-    Language.af: "Afrikaans",
-    Language.sq: "Albanian",
-    Language.ar: "Arabic",
-    Language.hy: "Armenian",
-    Language.az: "Azerbaijani",
-    Language.eu: "Basque",
-    Language.be: "Belarusian",
-    Language.bs_ba: "Bosnian",
-    Language.bg: "Bulgarian",
-    Language.ca: "Catalan",
-    Language.zh_cn: "Chinese (Simplified)",
-    Language.zh_tw: "Chinese (Traditional)",
-    Language.hr: "Croatian",
-    Language.cs: "Czech",
-    Language.da: "Danish",
-    Language.nl: "Dutch",
-    Language.en: "English",
-    Language.et: "Estonian",
-    Language.fi: "Finnish",
-    Language.fr: "French",
-    Language.gl: "Galician",
-    Language.ka: "Georgian",
-    Language.de: "German",
-    Language.el: "Greek",
-    Language.gu: "Gujarati",
-    Language.he: "Hebrew",
-    Language.hi: "Hindi",
-    Language.hu: "Hungarian",
-    Language.is_: "Icelandic",
-    Language.id_: "Indonesian",
-    Language.it: "Italian",
-    Language.ja: "Japanese",
-    Language.kn: "Kannada",
-    Language.kk: "Kazakh",
-    Language.ko: "Korean",
-    Language.lv: "Latvian",
-    Language.lt: "Lithuanian",
-    Language.mk: "Macedonian",
-    Language.mn: "Mongolian",
-    Language.ms: "Malay",
-    Language.mr: "Marathi",
-    Language.nb: "Norwegian (Bokmal)",
-    Language.nn_no: "Norwegian (Nynorsk)",
-    Language.pl: "Polish",
-    Language.pt: "Portuguese",
-    Language.pa: "Punjabi",
-    Language.ro: "Romanian",
-    Language.ru: "Russian",
-    Language.sk: "Slovak",
-    Language.sl: "Slovenian",
-    Language.es: "Spanish",
-    Language.sw: "Swahili",
-    Language.sv: "Swedish",
-    Language.tl: "Tagalog",
-    Language.ta: "Tamil",
-    Language.th: "Thai",
-    Language.tt: "Tatar",
-    Language.te: "Telugu",
-    Language.tr: "Turkish",
-    Language.uk: "Ukrainian",
-    Language.ur: "Urdu",
-    Language.uz: "Uzbek",
-    Language.vi: "Vietnamese",
-    Language.cy: "Welsh",
-    Language.yue: "Yue Chinese (Cantonese)",
+# NOTE: keyed by the plain str value, a Language member still hits the same entry because it is a str
+FULL_LANG: dict[str, str] = {
+    Language.af.value: "Afrikaans",
+    Language.sq.value: "Albanian",
+    Language.ar.value: "Arabic",
+    Language.hy.value: "Armenian",
+    Language.az.value: "Azerbaijani",
+    Language.eu.value: "Basque",
+    Language.be.value: "Belarusian",
+    Language.bs_ba.value: "Bosnian",
+    Language.bg.value: "Bulgarian",
+    Language.ca.value: "Catalan",
+    Language.zh_cn.value: "Chinese (Simplified)",
+    Language.zh_tw.value: "Chinese (Traditional)",
+    Language.hr.value: "Croatian",
+    Language.cs.value: "Czech",
+    Language.da.value: "Danish",
+    Language.nl.value: "Dutch",
+    Language.en.value: "English",
+    Language.et.value: "Estonian",
+    Language.fi.value: "Finnish",
+    Language.fr.value: "French",
+    Language.gl.value: "Galician",
+    Language.ka.value: "Georgian",
+    Language.de.value: "German",
+    Language.el.value: "Greek",
+    Language.gu.value: "Gujarati",
+    Language.he.value: "Hebrew",
+    Language.hi.value: "Hindi",
+    Language.hu.value: "Hungarian",
+    Language.is_.value: "Icelandic",
+    Language.id_.value: "Indonesian",
+    Language.it.value: "Italian",
+    Language.ja.value: "Japanese",
+    Language.kn.value: "Kannada",
+    Language.kk.value: "Kazakh",
+    Language.ko.value: "Korean",
+    Language.lv.value: "Latvian",
+    Language.lt.value: "Lithuanian",
+    Language.mk.value: "Macedonian",
+    Language.mn.value: "Mongolian",
+    Language.ms.value: "Malay",
+    Language.mr.value: "Marathi",
+    Language.nb.value: "Norwegian (Bokmal)",
+    Language.nn_no.value: "Norwegian (Nynorsk)",
+    Language.pl.value: "Polish",
+    Language.pt.value: "Portuguese",
+    Language.pa.value: "Punjabi",
+    Language.ro.value: "Romanian",
+    Language.ru.value: "Russian",
+    Language.sk.value: "Slovak",
+    Language.sl.value: "Slovenian",
+    Language.es.value: "Spanish",
+    Language.sw.value: "Swahili",
+    Language.sv.value: "Swedish",
+    Language.tl.value: "Tagalog",
+    Language.ta.value: "Tamil",
+    Language.th.value: "Thai",
+    Language.tt.value: "Tatar",
+    Language.te.value: "Telugu",
+    Language.tr.value: "Turkish",
+    Language.uk.value: "Ukrainian",
+    Language.ur.value: "Urdu",
+    Language.uz.value: "Uzbek",
+    Language.vi.value: "Vietnamese",
+    Language.cy.value: "Welsh",
+    Language.yue.value: "Yue Chinese (Cantonese)",
 }
 
 
@@ -102,7 +102,15 @@ from urllib.parse import ParseResult, urlparse, urlunparse
 
 from .exceptions import UriSchemaError
 from .utils.uri import normalize_url, uri_to_path
-from functools import cached_property
+from functools import lru_cache
+
+try:
+    from pydantic import VERSION as _PYDANTIC_VERSION
+except ImportError:
+    _PYDANTIC_VERSION = ""
+
+# pydantic 2 and any later major use the core schema hook, only 1.x needs `__get_validators__`
+_PYDANTIC_V2 = bool(_PYDANTIC_VERSION) and not _PYDANTIC_VERSION.startswith("1.")
 
 
 class AnyUri(str):
@@ -146,12 +154,22 @@ class AnyUri(str):
 
     """
 
+    # NOTE: a single slot instead of a per-instance __dict__, every subclass must declare empty __slots__
+    __slots__ = ("_parsed",)
+
+    _parsed: ParseResult
+
     def __new__(cls, value: Any) -> AnyUri:
         return cls.validate(value)
 
-    @cached_property
-    def _parsed(self) -> ParseResult:
-        return urlparse(self.as_uri())
+    @classmethod
+    def _create(cls, normalized: str) -> AnyUri:
+        """
+        Creates the instance from an already validated uri and parses its uri representation once.
+        """
+        obj = str.__new__(cls, normalized)
+        obj._parsed = urlparse(obj.as_uri())
+        return obj
 
     @property
     def scheme(self) -> str:
@@ -174,6 +192,13 @@ class AnyUri(str):
         """
         return self._parsed.path
 
+    @property
+    def basename(self) -> str:
+        """
+        The last component of the uri path.
+        """
+        return self._parsed.path.rpartition("/")[2]
+
     @property
     def params(self) -> str:
         """
@@ -240,23 +265,30 @@ class AnyUri(str):
         """
         return str(self)
 
-    # NOTE: this is a hack to make pydantic2 work with AnyUri
-    @no_type_check
-    @classmethod
-    def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> Any:
-        # one or more validators may be yielded which will be called in the
-        # order to validate the input, each validator will receive as an input
-        # the value returned from the previous validator
-        from pydantic_core import core_schema
-
-        return core_schema.no_info_after_validator_function(
-            cls.validate, core_schema.any_schema()
-        )
+    if _PYDANTIC_V2:
+        # NOTE: this is a hack to make pydantic2 work with AnyUri
+        @no_type_check
+        @classmethod
+        def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> Any:
+            # the str check runs in pydantic-core before the python validator is called,
+            # pathlib paths are still accepted as they are valid local uris
+            from pydantic_core import core_schema
+
+            return core_schema.no_info_after_validator_function(
+                cls.validate,
+                core_schema.union_schema(
+                    [
+                        core_schema.str_schema(),
+                        core_schema.is_instance_schema(pathlib.PurePath),
+                    ]
+                ),
+            )
 
-    # NOTE: this is a hack to make pydantic work with AnyUri
-    @classmethod
-    def __get_validators__(cls) -> Any:
-        yield cls.validate
+    else:
+        # NOTE: this is a hack to make pydantic work with AnyUri
+        @classmethod
+        def __get_validators__(cls) -> Any:
+            yield cls.validate
 
     @classmethod
     def validate(cls, value: Any) -> AnyUri:
@@ -273,15 +305,13 @@ class AnyUri(str):
             UriSchemaError: if the uri cannot be validated by any of the subclasses
         """
 
-        _sub_class: list[type[AnyUri]] = [GSUri, HttpUri, FileUri]
-        v = str(value)
-        for _cls in _sub_class:
-            try:
-                return _cls(v)
-            except UriSchemaError:
-                continue
+        if isinstance(value, AnyUri):
+            return value
 
-        raise UriSchemaError(f"Invalid URI: {value}")
+        v = str(value)
+        # NOTE: local paths are resolved against the working directory, so only real URIs are cached
+        _dispatch = _validate_cached if "://" in v else _validate_uncached
+        return _dispatch(v)
 
 
 class HttpUri(AnyUri):
@@ -296,13 +326,15 @@ class HttpUri(AnyUri):
         HttpUri("http://example.com/1.jpg")
     """
 
+    __slots__ = ()
+
     def __new__(cls, value: Any) -> HttpUri:
-        return str.__new__(cls, cls._validate(value))
+        return cls._create(cls._validate(value))
 
     @classmethod
-    def _validate(cls, value: Any) -> str:
+    def _validate(cls, value: Any, parsed: ParseResult | None = None) -> str:
         v = str(value)
-        p: ParseResult = urlparse(v)
+        p: ParseResult = urlparse(v) if parsed is None else parsed
         if p.scheme not in {"http", "https"}:
             raise UriSchemaError(f"Invalid scheme: {value}")
         return normalize_url(v)
@@ -334,19 +366,22 @@ class FileUri(AnyUri):
         FileUri will ignore the `query`, `fragment`, and `params` part of the uri
     """
 
+    __slots__ = ()
+
     def __new__(cls, value: Any) -> FileUri:
-        return str.__new__(cls, cls._validate(value))
+        return cls._create(cls._validate(value))
 
     @classmethod
-    def _validate(cls, value: Any) -> str:
+    def _validate(cls, value: Any, parsed: ParseResult | None = None) -> str:
         v = str(value)
 
         if "://" not in v:
             # NOTE: it is a local path
             path = pathlib.Path(v)
             v = path.resolve().as_uri()
+            parsed = None
 
-        p: ParseResult = urlparse(v)
+        p: ParseResult = urlparse(v) if parsed is None else parsed
 
         if p.scheme not in {"file"}:
             raise UriSchemaError(f"Invalid scheme: {value}")
@@ -377,13 +412,15 @@ class GSUri(AnyUri):
         GSUri will ignore the `query`, `fragment`, and `params` part of the uri
     """
 
+    __slots__ = ()
+
     def __new__(cls, value: Any) -> GSUri:
-        return str.__new__(cls, cls._validate(value))
+        return cls._create(cls._validate(value))
 
     @classmethod
-    def _validate(cls, value: Any) -> str:
+    def _validate(cls, value: Any, parsed: ParseResult | None = None) -> str:
         v = str(value)
-        p: ParseResult = urlparse(v)
+        p: ParseResult = urlparse(v) if parsed is None else parsed
         if p.scheme in {"http", "https"}:
             if p.netloc != "storage.googleapis.com":
                 raise UriSchemaError(f"Invalid netloc: {value}")
@@ -416,8 +453,68 @@ class GSUri(AnyUri):
     def validate(cls, value: Any) -> GSUri:
         return cls(cls._validate(value))
 
+    @property
+    def bucket(self) -> str:
+        """
+        The bucket name of the uri.
+        """
+        return self._parsed.netloc
+
+    @property
+    def key(self) -> str:
+        """
+        The object key of the uri within its bucket.
+        """
+        return self._parsed.path.lstrip("/")
+
     def as_uri(self) -> str:
         return self.replace("https://storage.googleapis.com/", "gs://")
 
 
+def _from_gs(v: str, p: ParseResult) -> AnyUri:
+    return GSUri._create(GSUri._validate(v, p))
+
+
+def _from_http_or_gs(v: str, p: ParseResult) -> AnyUri:
+    if p.netloc == "storage.googleapis.com":
+        return _from_gs(v, p)
+    return HttpUri._create(HttpUri._validate(v, p))
+
+
+def _from_file(v: str, p: ParseResult) -> AnyUri:
+    return FileUri._create(FileUri._validate(v, p))
+
+
+_SCHEME_TABLE = {
+    "gs": _from_gs,
+    "http": _from_http_or_gs,
+    "https": _from_http_or_gs,
+    "file": _from_file,
+    "": _from_file,
+}
+
+
+def _validate_uncached(v: str) -> AnyUri:
+    """
+    Finds the subclass that accepts the uri. The uri is parsed once and dispatched by its scheme.
+
+    Returns:
+        the uri as an instance of the matching subclass
+
+    Raises:
+        UriSchemaError: if the scheme is not supported or the matching subclass rejects the uri
+    """
+    p: ParseResult = urlparse(v)
+    handler = _SCHEME_TABLE.get(p.scheme)
+    if handler is None:
+        if "://" in v:
+            raise UriSchemaError(f"Invalid URI: {v}")
+        # NOTE: a local path like "foo:bar.jpg" is parsed as having a scheme
+        handler = _from_file
+    return handler(v, p)
+
+
+_validate_cached = lru_cache(maxsize=8192)(_validate_uncached)
+
+
 __all__ = ["AnyUri", "HttpUri", "FileUri", "GSUri"]
@@ -14,13 +14,18 @@ NOTE:
     - And other advanced features
 
 NOTE:
-    This module is intentionally designed for simplicity and relies solely on the standard library and the `google-cloud-storage` package.
+    This module is intentionally designed for simplicity and relies solely on the standard library, `urllib3` and the `google-cloud-storage` package.
     As the `google-cloud-storage` package does not support asynchronous operations, this module also does not support async functionality.
 """
 
+import mimetypes
+import os
 import shutil
-from os.path import basename, join, splitext
+from os.path import splitext
 from pathlib import Path
+from typing import BinaryIO
+
+import urllib3
 
 from .anyuri import AnyUri, FileUri, GSUri, HttpUri
 from .exceptions import DownloadError, FileCopyError, UploadError, UriSchemaError
@@ -29,17 +34,53 @@ from .utils.gs import (
     download_from_gs_uri,
     download_from_http_url,
     extract_ext_from_uri,
+    random_gs_uri,
+    upload_file_to_gs_uri,
+    upload_from_http_url,
     upload_to_gs_uri,
 )
 
 
+def _link_or_copy(src: str, dst: str) -> None:
+    """
+    Gives `dst` the content of `src` as cheaply as the file system allows.
+
+    A hardlink is tried first, then `os.copy_file_range` so the kernel copies (or reflinks) the data without a user-space bounce, and finally `shutil.copy`.
+
+    Args:
+        src: The source file path.
+        dst: The destination file path, it must not exist.
+    """
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                remaining = os.fstat(s.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass
+
+    shutil.copy(src, dst)
+
+
 def local(uri: AnyUri | Path | str) -> FileUri:
     """
     Downloads the specified URI to the local temporary file system.
 
     This function aims to preserve the same file extension as the original URI, while generating a unique filename to avoid any conflicts.
 
-    - If the URI points to a local file, the function duplicates it in the local file system.
+    - If the URI points to a local file, the function duplicates it in the local file system. A hardlink or reflink is used when possible, so the returned file should be treated as read-only.
     - If the URI is an HTTP URL, the function fetches the file and stores it in the local file system.
     - If the URI is a GS URL, the function employs the Google Cloud Storage SDK to download the file to the local file system, even if the file is not publicly accessible.
 
@@ -68,7 +109,8 @@ def local(uri: AnyUri | Path | str) -> FileUri:
 
     if isinstance(any_uri, FileUri):
         try:
-            return shutil.copy(any_uri.as_source(), target_file_uri.as_source())
+            _link_or_copy(any_uri.as_source(), target_file_uri.as_source())
+            return target_file_uri
         except Exception as e:
             raise FileCopyError(f"failed to copy {any_uri}") from e
 
@@ -88,7 +130,8 @@ def remote(
     """
     Uploads the URI to our cloud storage at our temporary storage `gs://livingbio-tmp` and returns the file's GSUri. When the upload happens, it always uses a random filename to avoid conflicts.
 
-    - If the URI is a GSUri or HttpUri, the function will first download it to the local file system and then upload it to the cloud storage.
+    - If the URI is a GSUri, the function will first download it to the local file system and then upload it to the cloud storage.
+    - If the URI is an HttpUri, the function streams the response straight to the cloud storage, it only spools the same response through the local file system when the server does not report a Content-Length or the file is larger than 8 MiB.
     - If the URI is already a local file, the function will upload it directly to the cloud storage.
 
     Args:
@@ -109,7 +152,17 @@ def remote(
     """
     _uri = AnyUri(uri)
 
-    if isinstance(_uri, (GSUri, HttpUri)):
+    if isinstance(_uri, HttpUri):
+        target_uri = random_gs_uri(location, extract_ext_from_uri(_uri))
+
+        try:
+            return upload_from_http_url(_uri, target_uri)
+        except urllib3.exceptions.HTTPError as e:
+            raise DownloadError(f"failed to download {_uri}") from e
+        except Exception as e:
+            raise UploadError(f"failed to upload {uri} to {target_uri}") from e
+
+    if isinstance(_uri, GSUri):
         path = local(_uri)
 
     elif isinstance(_uri, FileUri):
@@ -120,9 +173,40 @@ def remote(
 
     _, ext = splitext(path)
 
-    target_uri = join(location, basename(filename(suffix=ext)))
+    target_uri = random_gs_uri(location, ext)
 
     try:
-        return upload_to_gs_uri(path, GSUri(target_uri))
+        return upload_to_gs_uri(path, target_uri)
     except Exception as e:
         raise UploadError(f"failed to upload {uri} to {target_uri}") from e
+
+
+def upload_bytes_to_gs(
+    buf: BinaryIO,
+    ext: str,
+    location: str = "gs://livingbio-tmp",
+) -> GSUri:
+    """
+    Uploads an in-memory buffer to our cloud storage and returns the file's GSUri, without writing it to the local file system first.
+
+    Args:
+        buf: The buffer to upload, it is read from its current position to the end.
+        ext: The file extension of the uploaded file, it also decides the content type.
+        location: The cloud storage location to upload the file to. Defaults to `gs://livingbio-tmp`.
+
+    Returns:
+        The uploaded file's GSUri.
+
+    Raises:
+        UploadError: If the upload operation fails.
+
+    NOTE:
+        Like `remote`, this function always uses a random filename to avoid conflicts.
+    """
+    target_uri = random_gs_uri(location, ext)
+    content_type, _ = mimetypes.guess_type(target_uri.basename)
+
+    try:
+        return upload_file_to_gs_uri(buf, target_uri, content_type=content_type)
+    except Exception as e:
+        raise UploadError(f"failed to upload buffer to {target_uri}") from e
@@ -5,6 +5,7 @@ This feature is particularly beneficial in a web server context, where it's esse
 """
 
 import pathlib
+import secrets
 import tempfile
 import threading
 from contextlib import contextmanager
@@ -33,8 +34,10 @@ def threading_tempdir() -> Generator[str, None, None]:
     """
     with tempfile.TemporaryDirectory() as tempdir:
         _thread_locals.tempdir = tempdir
-        yield tempdir
-        _thread_locals.tempdir = None
+        try:
+            yield tempdir
+        finally:
+            _thread_locals.tempdir = None
 
 
 def get_threading_tempdir() -> Optional[str]:
@@ -72,7 +75,7 @@ def filepath(suffix: str = None, prefix: str = None) -> pathlib.Path:
     Creates a temporary filepath without actually creating a file.
 
     - If 'threading_tempdir' is enabled, the file will be automatically deleted when the context exits.
-    - If 'threading_tempdir' is not enabled, the temporary file behaves like a regular 'tempfile.NamedTemporaryFile'.
+    - If 'threading_tempdir' is not enabled, the path is placed in the system temporary directory and is not deleted automatically.
 
     Args:
         suffix: The suffix of the temporary file. If suffix is not specified, it will be set to `.unknown`. If suffix does not start with `.`, `.` will be added to the beginning of suffix.
@@ -91,10 +94,9 @@ def filepath(suffix: str = None, prefix: str = None) -> pathlib.Path:
     if not suffix.startswith("."):
         suffix = "." + suffix
 
-    with tempfile.NamedTemporaryFile(
-        prefix=prefix, suffix=suffix, dir=get_threading_tempdir()
-    ) as ofile:
-        return ofile.name
+    # 96 bits of randomness keep the name unique without creating and deleting a file
+    name = f"{prefix or 'tmp'}{secrets.token_hex(12)}{suffix}"
+    return pathlib.Path(get_threading_tempdir() or tempfile.gettempdir()) / name
 
 
 def filename(suffix: str = None, prefix: str = None) -> str:
@@ -102,7 +104,7 @@ def filename(suffix: str = None, prefix: str = None) -> str:
     Creates a temporary filepath without actually creating a file.
 
     - If 'threading_tempdir' is enabled, the file will be automatically deleted when the context exits.
-    - If 'threading_tempdir' is not enabled, the temporary file behaves like a regular 'tempfile.NamedTemporaryFile'.
+    - If 'threading_tempdir' is not enabled, the path is placed in the system temporary directory and is not deleted automatically.
 
     Args:
         suffix: The suffix of the temporary file. If suffix is not specified, it will be set to `.unknown`. If suffix does not start with `.`, `.` will be added to the beginning of suffix.
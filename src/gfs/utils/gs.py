@@ -1,12 +1,127 @@
+import os
 import re
-from os.path import splitext
-from urllib.parse import urlparse
-from urllib.request import build_opener, install_opener, urlretrieve
+import shutil
+import threading
+from functools import lru_cache
+from typing import BinaryIO
+from os.path import basename, join, splitext
 
+import urllib3
 from google.cloud import storage  # type: ignore
+from google.cloud.storage import transfer_manager  # type: ignore
 
 from ..credential import get_crendential
 from ..anyuri import AnyUri, FileUri, GSUri, HttpUri
+from ..temp import filename
+
+# A pooled HTTP client shared by all downloads, connections to the same host are kept alive
+_http_pool = urllib3.PoolManager(
+    num_pools=8,
+    maxsize=32,
+    headers={
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
+    },
+)
+
+# Files larger than this are uploaded as concurrent chunks of `UPLOAD_CHUNK_SIZE` bytes
+UPLOAD_CONCURRENT_THRESHOLD = 32 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_MAX_WORKERS = 8
+
+# Regular expression for validating a file extension
+# This pattern checks for a starting dot, followed by 1 to 10 alphanumeric characters
+# You can adjust the [A-Za-z0-9] part to include any additional characters you consider valid
+_EXT_RE = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+
+# Larger uploads switch to resumable uploads, whose retries have to seek back in the source stream
+# which an HTTP response cannot do, matches `google.cloud.storage.blob._MAX_MULTIPART_SIZE`
+STREAM_UPLOAD_MAX_SIZE = 8 * 1024 * 1024
+
+_client_lock = threading.Lock()
+_client: storage.Client | None = None
+
+
+@lru_cache(maxsize=1)
+def _cached_credential():
+    """
+    Get the service account credential once per process, google-auth refreshes the token by itself when it expires.
+
+    Returns:
+        The credential, None to fall back to the default credential of the environment.
+    """
+    return get_crendential()
+
+
+def _get_client() -> storage.Client:
+    """
+    Get the process-wide Google Cloud Storage client, it is created on first use.
+    Sharing one client keeps the underlying HTTP connections alive across calls.
+
+    Returns:
+        The shared storage client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = storage.Client(credentials=_cached_credential())
+    return _client
+
+
+@lru_cache(maxsize=None)
+def _get_bucket(name: str) -> storage.Bucket:
+    """
+    Get the bucket object of the shared client, each bucket is created only once.
+
+    Args:
+        name: The bucket name.
+
+    Returns:
+        The bucket object.
+    """
+    return _get_client().bucket(name)
+
+
+def random_gs_uri(location: str, ext: str | None = None) -> GSUri:
+    """
+    Mint a GS URI with a random filename under the specified location.
+
+    Args:
+        location: The cloud storage location, e.g. `gs://livingbio-tmp`.
+        ext: The file extension of the file, ".unknown" is used if it is not specified.
+
+    Returns:
+        The GS URI, nothing is uploaded yet.
+    """
+    return GSUri(join(location, basename(filename(suffix=ext or None))))
+
+
+def random_blob(location: str, ext: str | None = None) -> storage.Blob:
+    """
+    Mint a blob with a random filename under the specified location, see `random_gs_uri`.
+
+    Args:
+        location: The cloud storage location, e.g. `gs://livingbio-tmp`.
+        ext: The file extension of the file, ".unknown" is used if it is not specified.
+
+    Returns:
+        The blob of the shared client, nothing is uploaded yet.
+    """
+    gs_uri = random_gs_uri(location, ext)
+    return _get_bucket(gs_uri.bucket).blob(gs_uri.key)
+
+
+def blob_gs_uri(blob: storage.Blob) -> GSUri:
+    """
+    Get the GS URI of a blob.
+
+    Args:
+        blob: The blob.
+
+    Returns:
+        The GS URI of the blob.
+    """
+    return GSUri(f"gs://{blob.bucket.name}/{blob.name}")
 
 
 def is_legal_file_ext(ext: str) -> bool:
@@ -20,11 +135,7 @@ def is_legal_file_ext(ext: str) -> bool:
         True if the file extension is legal, False otherwise.
     """
 
-    # Regular expression for validating a file extension
-    # This pattern checks for a starting dot, followed by 1 to 10 alphanumeric characters
-    # You can adjust the [A-Za-z0-9] part to include any additional characters you consider valid
-    pattern = r"^\.[A-Za-z0-9]{1,10}$"
-    return bool(re.match(pattern, ext))
+    return _EXT_RE.match(ext) is not None
 
 
 def extract_ext_from_uri(http_uri: AnyUri) -> str | None:
@@ -39,20 +150,9 @@ def extract_ext_from_uri(http_uri: AnyUri) -> str | None:
         The extract file extension, None if the URL does not have a valid file extension
     """
 
-    # Parse the URL to extract the path
-    parsed_url = urlparse(http_uri.as_uri())
-    path = parsed_url.path
-
-    # Split the path by '/' to get the last part
-    path_parts = path.split("/")
-    filename = path_parts[-1]
-
-    # Split the filename by '.' to get the file extension
-    name, ext = splitext(filename)
-    if is_legal_file_ext(ext):
-        return ext
-
-    return None
+    # The uri is parsed once on construction, only split the last path component here
+    _, ext = splitext(http_uri.basename)
+    return ext if is_legal_file_ext(ext) else None
 
 
 def download_from_http_url(http_uri: HttpUri, local_filepath: FileUri) -> FileUri:
@@ -67,21 +167,95 @@ def download_from_http_url(http_uri: HttpUri, local_filepath: FileUri) -> FileUr
         The local path where the file has been downloaded.
     """
 
-    # Create an opener object
-    opener = build_opener()
-    opener.addheaders = [
-        (
-            "User-Agent",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-        )
-    ]
-
-    # Install the opener globally so it will be used for all urllib.request.urlopen calls
-    install_opener(opener)
-    path, _ = urlretrieve(http_uri, local_filepath)
+    with _http_pool.request("GET", http_uri.as_uri(), preload_content=False) as r:
+        # Check the status before creating the file, so a failed request leaves nothing behind
+        if r.status >= 400:
+            raise urllib3.exceptions.HTTPError(f"HTTP {r.status} for {http_uri}")
+        with open(local_filepath, "wb") as f:
+            shutil.copyfileobj(r, f, length=1 << 20)
+        r.release_conn()
     return local_filepath
 
 
+def _content_length(r: urllib3.BaseHTTPResponse) -> int | None:
+    """
+    Get the body size reported by the server.
+
+    Args:
+        r: The HTTP response.
+
+    Returns:
+        The Content-Length, None if it is missing or malformed.
+    """
+    try:
+        size = int(r.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+    return size if size >= 0 else None
+
+
+def upload_from_http_url(http_uri: HttpUri, gs_uri: GSUri) -> GSUri:
+    """
+    Streams the specified HTTP URL straight into a Google Cloud Storage (GS) URI, without a local copy when possible.
+
+    If the server does not report a Content-Length or the object is larger than `STREAM_UPLOAD_MAX_SIZE`,
+    the already opened response is copied to a local temporary file and uploaded from there, the URL is only requested once.
+
+    Args:
+        http_uri: The HTTP URL to download.
+        gs_uri: The GS URI where the file will be uploaded.
+
+    Returns:
+        The GS URI where the file has been uploaded.
+    """
+
+    with _http_pool.request("GET", http_uri.as_uri(), preload_content=False) as r:
+        if r.status >= 400:
+            raise urllib3.exceptions.HTTPError(f"HTTP {r.status} for {http_uri}")
+
+        size = _content_length(r)
+        if size is not None and 0 < size <= STREAM_UPLOAD_MAX_SIZE:
+            blob = _get_bucket(gs_uri.bucket).blob(gs_uri.key)
+            # Within the limit the body is read once and sent as a multipart upload, so retries never seek the response
+            blob.upload_from_file(
+                r, size=size, content_type=r.headers.get("Content-Type")
+            )
+            r.release_conn()
+            return gs_uri
+
+        _, ext = splitext(gs_uri.basename)
+        local_filepath = FileUri(filename(suffix=ext or None))
+        with open(local_filepath, "wb") as f:
+            shutil.copyfileobj(r, f, length=1 << 20)
+        r.release_conn()
+
+    return upload_to_gs_uri(local_filepath, gs_uri)
+
+
+def upload_file_to_gs_uri(
+    file_obj: BinaryIO, gs_uri: GSUri, content_type: str | None = None
+) -> GSUri:
+    """
+    Uploads an in-memory file object to a specified Google Cloud Storage (GS) URI.
+
+    Args:
+        file_obj: The file object to be uploaded, it is read from its current position to the end.
+        gs_uri: The GS URI where the file will be uploaded.
+        content_type: The content type of the uploaded object.
+
+    Returns:
+        The GS URI where the file has been uploaded.
+    """
+
+    blob = _get_bucket(gs_uri.bucket).blob(gs_uri.key)
+    start = file_obj.tell()
+    size = file_obj.seek(0, os.SEEK_END) - start
+    file_obj.seek(start)
+    blob.upload_from_file(file_obj, size=size, content_type=content_type)
+
+    return gs_uri
+
+
 def download_from_gs_uri(gs_uri: GSUri, local_filepath: FileUri) -> FileUri:
     """
     Downloads the specified Google Cloud Storage (GS) URI to the local file system.
@@ -93,22 +267,11 @@ def download_from_gs_uri(gs_uri: GSUri, local_filepath: FileUri) -> FileUri:
     Returns:
         The local path where the file has been downloaded.
     """
-    p = urlparse(gs_uri.as_uri())
-
-    # Set your Google Cloud Storage bucket name
-    bucket_name = p.netloc
-
-    # Set the path of the file you want to download in the bucket
-    file_path = p.path.lstrip("/")
-
-    # Initialize a client
-    client = storage.Client(credentials=get_crendential())
-
-    # Get the bucket
-    bucket = client.bucket(bucket_name)
+    # Get the bucket from the shared client, the bucket name and key are split once when the GSUri is built
+    bucket = _get_bucket(gs_uri.bucket)
 
     # Get the blob (file) you want to download
-    blob = bucket.blob(file_path)
+    blob = bucket.blob(gs_uri.key)
 
     # Download the file
     blob.download_to_filename(local_filepath)
@@ -128,24 +291,22 @@ def upload_to_gs_uri(local_file_path: FileUri, gs_uri: GSUri) -> GSUri:
         The GS URI where the file has been uploaded.
     """
 
-    p = urlparse(gs_uri.as_uri())
-
-    # Set your Google Cloud Storage bucket name
-    bucket_name = p.netloc
-
-    # Set the destination path within the bucket where you want to upload the file
-    destination_blob_name = p.path.lstrip("/")
-
-    # Initialize a client
-    client = storage.Client(credentials=get_crendential())
-
-    # Get the bucket
-    bucket = client.bucket(bucket_name)
+    # Get the bucket from the shared client, the bucket name and key are split once when the GSUri is built
+    bucket = _get_bucket(gs_uri.bucket)
 
     # Create a blob (file) with the specified destination path
-    blob = bucket.blob(destination_blob_name)
-
-    # Upload the local file to the specified blob (file)
-    blob.upload_from_filename(local_file_path)
+    blob = bucket.blob(gs_uri.key)
+
+    # Upload the local file to the specified blob (file), large files are sent as parallel chunks
+    if os.path.getsize(local_file_path) > UPLOAD_CONCURRENT_THRESHOLD:
+        transfer_manager.upload_chunks_concurrently(
+            local_file_path,
+            blob,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            max_workers=UPLOAD_MAX_WORKERS,
+            worker_type=transfer_manager.THREAD,
+        )
+    else:
+        blob.upload_from_filename(local_file_path)
 
     return gs_uri
@@ -1,25 +1,47 @@
+import io
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import torch
+from PIL import Image
+from torchvision.io import encode_jpeg
 from tqdm import tqdm
 from diffusers.utils import load_image
 from diffusers import FluxTransformer2DModel
+from optimum.quanto import freeze, qfloat8, quantize
 
 from sdk.pipeline_flux_fill_with_cfg import FluxFillCFGPipeline
 from cvat_parser import FluxDataset, FluxData
-from gfs.temp import filename
 from gfs.utils.gs import upload_to_gs_uri
 from gfs.anyuri import GSUri
-from gfs.store import remote
+from gfs.store import upload_bytes_to_gs
 from constant import GSDIR
 
+BATCH_SIZE = 4
+PREFETCH = 2
+# FLUX 的 flow matching scheduler 在 20~28 步已收斂，50 步幾乎只是多花時間
+NUM_INFERENCE_STEPS = 24
+
 
 class TextRemover:
-    def __init__(self):
+    def __init__(
+        self,
+        fp8: bool = True,
+        compile: bool = True,
+        num_inference_steps: int = NUM_INFERENCE_STEPS,
+    ):
+        # 傳 50 可重現原本的步數，與 24 步的輸出做比對
+        self.num_inference_steps = num_inference_steps
         transformer_onereward = FluxTransformer2DModel.from_pretrained(
             "bytedance-research/OneReward",
             subfolder="flux.1-fill-dev-OneReward-transformer",
             torch_dtype=torch.bfloat16,
         )
+        if fp8:
+            # 只把 transformer 權重量化成 FP8，activation 維持 bf16，減少每個 denoise step 的記憶體頻寬
+            quantize(transformer_onereward, weights=qfloat8)
+            freeze(transformer_onereward)
 
         self.pipe = FluxFillCFGPipeline.from_pretrained(
             "black-forest-labs/FLUX.1-Fill-dev",
@@ -27,25 +49,76 @@ class TextRemover:
             torch_dtype=torch.bfloat16,
         ).to("cuda")
 
-    def run(self, data: FluxData):
-        image = load_image(data.image)
-        mask = load_image(data.mask)
-        image = self.pipe(
-            prompt="remove",
-            negative_prompt="nsfw",
-            image=image,
-            mask_image=mask,
-            height=image.height,
-            width=image.width,
+        if compile:
+            # 影片有幾十種 (H, W)，加上不滿一批的 batch，不錄 CUDA graph 以免每種 shape 各錄一份、各佔一塊記憶體；
+            # 尺寸第一次改變時 dynamo 會改以 dynamic shape 重新編譯，之後不同尺寸共用同一份編譯結果
+            torch.backends.cuda.matmul.allow_tf32 = True
+            self.pipe.transformer = torch.compile(
+                self.pipe.transformer,
+                mode="max-autotune-no-cudagraphs",
+                fullgraph=False,
+            )
+            self.pipe.vae.decode = torch.compile(self.pipe.vae.decode)
+
+    def run(
+        self, images: list[Image.Image], masks: list[Image.Image]
+    ) -> list[io.BytesIO]:
+        """同尺寸的 frame 一起送進 pipeline，一次 denoise 處理整批"""
+        results = self.pipe(
+            prompt=["remove"] * len(images),
+            negative_prompt=["nsfw"] * len(images),
+            image=images,
+            mask_image=masks,
+            height=images[0].height,
+            width=images[0].width,
             guidance_scale=1.0,
             true_cfg=4.0,
-            num_inference_steps=50,
-            generator=torch.Generator("cpu").manual_seed(0),
-        ).images[0]
+            num_inference_steps=self.num_inference_steps,
+            # 每張各自一個 seed 0 的 generator，結果與逐張執行相同
+            generator=[torch.Generator("cpu").manual_seed(0) for _ in images],
+            output_type="pt",
+        ).images
+
+        # 結果留在 GPU 上直接用 nvJPEG 編碼，只把 JPEG bytes 搬回 CPU，不落地直接上傳
+        results = (results * 255).round().clamp(0, 255).to(torch.uint8)
+        return [
+            io.BytesIO(encoded.cpu().numpy().tobytes())
+            for encoded in encode_jpeg(list(results), quality=92)
+        ]
+
+
+def batched(dataset, batch_size: int):
+    """把連續且尺寸相同的 frame 分成一批，最多 batch_size 張"""
+    batch = []
+    for data in dataset:
+        size = (data.mask.height, data.mask.width)
+        if batch and (
+            len(batch) == batch_size
+            or size != (batch[0].mask.height, batch[0].mask.width)
+        ):
+            yield batch
+            batch = []
+        batch.append(data)
+    if batch:
+        yield batch
+
+
+def load_batch(batch: list[FluxData]):
+    """讀入整批的 frame 並畫出 mask"""
+    images = [load_image(data.image) for data in batch]
+    masks = [Image.fromarray(data.mask.rasterize()) for data in batch]
+    return batch, images, masks
 
-        output_path = filename(".jpg")
-        image.save(output_path)
-        return remote(output_path, location=GSDIR)
+
+def prefetched(batches, executor: ThreadPoolExecutor, depth: int):
+    """在背景先解碼後面 depth 批，GPU 處理目前這批時不必等圖檔讀取"""
+    queue = deque()
+    for batch in batches:
+        queue.append(executor.submit(load_batch, batch))
+        if len(queue) > depth:
+            yield queue.popleft().result()
+    while queue:
+        yield queue.popleft().result()
 
 
 if __name__ == "__main__":
@@ -55,12 +128,45 @@ if __name__ == "__main__":
     with open(metadata_path, "r") as fp:
         metadata = json.load(fp)
 
-    for data in tqdm(
-        dataset, total=len(dataset), desc=f"running {dataset._current_frame_index} data"
-    ):
-        result = remover.run(data)
-        metadata[data.frame_number] = result
+    # resume 位置只推進到「自己與之前所有 frame 都已寫進 metadata」的地方，
+    # 已讀出但還在 prefetch、推論或上傳中的 frame 中斷後會重新處理
+    finished = set()
+    resume_index = dataset._current_frame_index
+
+    def flush(done):
+        global resume_index
+        for future in done:
+            data = pending.pop(future)
+            metadata[data.frame_number] = future.result()
+            finished.add(data.index)
         with open(metadata_path, "w") as fp:
             json.dump(metadata, fp)
 
+        while resume_index in finished:
+            finished.remove(resume_index)
+            resume_index += 1
+        dataset.commit(resume_index)
+
+    # GCS 上傳丟給 thread pool，與下一批的 GPU 推論重疊
+    pending = {}
+    with (
+        ThreadPoolExecutor(max_workers=4) as pool,
+        ThreadPoolExecutor(max_workers=PREFETCH) as loader,
+    ):
+        batches = batched(
+            tqdm(
+                dataset,
+                total=len(dataset),
+                desc=f"running {dataset._current_frame_index} data",
+            ),
+            BATCH_SIZE,
+        )
+        for batch, images, masks in prefetched(batches, loader, PREFETCH):
+            for data, buf in zip(batch, remover.run(images, masks)):
+                future = pool.submit(upload_bytes_to_gs, buf, ".jpg", location=GSDIR)
+                pending[future] = data
+            flush([future for future in pending if future.done()])
+
+        flush(wait(pending).done)
+
     upload_to_gs_uri(metadata_path, GSUri(f"{GSDIR}/metadata.json"))
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import subprocess
 from gfs.store import local
 from gfs import temp
@@ -15,6 +17,21 @@ def execute_ffmpeg_cmd(cmd: list[str], output_path: str):
         raise Exception(f"處理影片時發生錯誤: {str(e)}")
 
 
+async def execute_ffmpeg_cmd_async(cmd: list[str], output_path: str):
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg 錯誤: {stderr.decode(errors='replace')}")
+
+        return output_path
+    except Exception as e:
+        raise Exception(f"處理影片時發生錯誤: {str(e)}")
+
+
 def extract_frame(file: str, frame_number: int):
     input_path = local(file)
     output_path = temp.filename(".jpg")
@@ -33,3 +50,43 @@ def extract_frame(file: str, frame_number: int):
         output_path,
     ]
     return execute_ffmpeg_cmd(cmd, output_path)
+
+
+def _extract_frames_cmd(input_path: str, frame_numbers: list[int], output_dir):
+    select = "+".join(f"eq(n\\,{n})" for n in frame_numbers)
+    return [
+        "ffmpeg",
+        "-i",
+        input_path,
+        "-vf",
+        f"select={select}",
+        "-vsync",
+        "vfr",
+        # 選滿所有 frame 就停止，不必把影片解到結尾
+        "-frames:v",
+        str(len(frame_numbers)),
+        "-q:v",
+        "2",
+        "-y",
+        str(output_dir / "%d.jpg"),
+    ]
+
+
+def _collect_frames(frame_numbers: list[int], output_dir) -> dict[int, str]:
+    # 輸出檔依選到的順序從 1 開始編號
+    outputs = {n: str(output_dir / f"{i}.jpg") for i, n in enumerate(frame_numbers, 1)}
+    missing = [n for n, path in outputs.items() if not os.path.exists(path)]
+    if missing:
+        raise Exception(f"處理影片時發生錯誤: 找不到 frame {missing}")
+    return outputs
+
+
+async def extract_frames_async(file: str, frame_numbers: list[int]) -> dict[int, str]:
+    """一次 ffmpeg 呼叫解出多個 frame，回傳 {frame_number: 圖片路徑}；下載在 executor 中進行，ffmpeg 不佔用 thread"""
+    frame_numbers = sorted(set(frame_numbers))
+    input_path = await asyncio.to_thread(local, file)
+    output_dir = temp.dirname()
+
+    cmd = _extract_frames_cmd(input_path, frame_numbers, output_dir)
+    await execute_ffmpeg_cmd_async(cmd, str(output_dir))
+    return _collect_frames(frame_numbers, output_dir)
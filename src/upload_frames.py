@@ -1,30 +1,101 @@
-import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from os.path import splitext
 
+import orjson
+from google.cloud.storage import transfer_manager
 from tqdm import tqdm
-from cvat_parser import FluxDataset
-from gfs.utils.gs import upload_to_gs_uri
-from gfs.store import remote
+from cvat_parser import FluxData, FluxDataset
+from gfs.utils.gs import blob_gs_uri, random_blob, upload_to_gs_uri
 from gfs.anyuri import GSUri
 from constant import FRAMEDIR, MASKDIR
 
-frame_metadata = {}
-mask_metadata = {}
+BATCH_SIZE = 256
+
+# 每批上傳完就把結果追加進 jsonl，中途中斷也不會遺失已上傳的紀錄
+records_path = "frame_metadata.jsonl"
 frame_metadata_path = "frame_metadata.json"
 mask_metadata_path = "mask_metadata.json"
 
+
+def upload_batch(batch: list[FluxData], executor: ThreadPoolExecutor) -> list[dict]:
+    # mask 的 PNG 編碼丟給 thread pool，再把整批 frame 與 mask 交給 transfer_manager 一次上傳
+    mask_paths = list(executor.map(lambda data: data.mask.save(), batch))
+    frame_blobs = [random_blob(FRAMEDIR, splitext(data.image)[1]) for data in batch]
+    mask_blobs = [random_blob(MASKDIR, splitext(path)[1]) for path in mask_paths]
+
+    transfer_manager.upload_many(
+        [(data.image, blob) for data, blob in zip(batch, frame_blobs)]
+        + list(zip(mask_paths, mask_blobs)),
+        max_workers=16,
+        worker_type=transfer_manager.THREAD,
+        raise_exception=True,
+    )
+    return [
+        {
+            "frame": data.frame_number,
+            "frame_uri": str(blob_gs_uri(frame_blob)),
+            "mask_uri": str(blob_gs_uri(mask_blob)),
+        }
+        for data, frame_blob, mask_blob in zip(batch, frame_blobs, mask_blobs)
+    ]
+
+
+def open_records(path: str):
+    """以 append 模式開啟 jsonl，先把中斷時殘留的不完整最後一行截掉，新紀錄才不會接在半行後面"""
+    fp = open(path, "ab+")
+    end = fp.seek(0, os.SEEK_END)
+    pos = end
+    while pos > 0:
+        step = min(8192, pos)
+        fp.seek(pos - step)
+        newline = fp.read(step).rfind(b"\n")
+        if newline != -1:
+            pos = pos - step + newline + 1
+            break
+        pos -= step
+    if pos != end:
+        fp.truncate(pos)
+    return fp
+
+
+def consolidate(path: str) -> tuple[dict, dict]:
+    """讀回 jsonl 組成 frame_number -> uri 的 dict，同一個 frame 以最後一筆為準"""
+    frames, masks = {}, {}
+    with open(path, "rb") as fp:
+        for line in fp:
+            record = orjson.loads(line)
+            frames[record["frame"]] = record["frame_uri"]
+            masks[record["frame"]] = record["mask_uri"]
+    # 依 frame_number 由小到大排序，輸出的 key 順序與上傳順序、續跑次數無關
+    return (
+        {k: frames[k] for k in sorted(frames)},
+        {k: masks[k] for k in sorted(masks)},
+    )
+
+
 dataset = FluxDataset()
-for data in tqdm(
-    dataset, total=len(dataset), desc=f"start from {dataset._current_frame_index}"
+iterator = iter(
+    tqdm(dataset, total=len(dataset), desc=f"start from {dataset._current_frame_index}")
+)
+with (
+    ThreadPoolExecutor(max_workers=16) as executor,
+    open_records(records_path) as records,
 ):
-    frame = remote(data.image, location=FRAMEDIR)
-    mask = remote(data.mask, location=MASKDIR)
-    frame_metadata[data.frame_number] = frame
-    mask_metadata[data.frame_number] = mask
-
-with open(frame_metadata_path, "w") as fp:
-    json.dump(frame_metadata, fp)
-with open(mask_metadata_path, "w") as fp:
-    json.dump(mask_metadata, fp)
+    while batch := list(islice(iterator, BATCH_SIZE)):
+        for record in upload_batch(batch, executor):
+            records.write(orjson.dumps(record) + b"\n")
+        records.flush()
+        os.fsync(records.fileno())
+        # jsonl 確實落地後才推進 resume 位置，中斷時這批會重新上傳，consolidate 以最後一筆為準
+        dataset.commit(batch[-1].index + 1)
+
+frame_metadata, mask_metadata = consolidate(records_path)
+with open(frame_metadata_path, "wb") as fp:
+    fp.write(orjson.dumps(frame_metadata, option=orjson.OPT_NON_STR_KEYS))
+with open(mask_metadata_path, "wb") as fp:
+    fp.write(orjson.dumps(mask_metadata, option=orjson.OPT_NON_STR_KEYS))
 
 upload_to_gs_uri(frame_metadata_path, GSUri(f"{FRAMEDIR}/metadata.json"))
 upload_to_gs_uri(mask_metadata_path, GSUri(f"{MASKDIR}/metadata.json"))